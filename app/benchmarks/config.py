@@ -17,6 +17,14 @@ DL_PRETRAINED = "DL_PRETRAINED"
 DL_MAML = "DL_MAML"
 
 
+# Random forest configurations. Bounding tree growth keeps both fit and
+# predict_proba cheap (prediction cost is proportional to tree depth)
+# and shrinks the fitted models
+RF_N_ESTIMATORS = 100
+RF_MAX_DEPTH = 20
+RF_MIN_SAMPLES_LEAF = 5
+
+
 # LSTM model configurations
 HIDDEN_VECTOR_SIZE = 128
 NUM_CLASSIFICATION_LAYERS = 2
@@ -1,15 +1,43 @@
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import json
+import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 
 from cropharvest.datasets import CropHarvest
 from cropharvest.utils import DATAFOLDER_PATH
 from cropharvest.engineer import TestInstance
 
-from config import SHUFFLE_SEEDS, DATASET_TO_SIZES, RANDOM_FOREST
+from config import (
+    SHUFFLE_SEEDS,
+    DATASET_TO_SIZES,
+    RANDOM_FOREST,
+    RF_N_ESTIMATORS,
+    RF_MAX_DEPTH,
+    RF_MIN_SAMPLES_LEAF,
+)
 
+from typing import Optional
 
-def run(data_folder: Path = DATAFOLDER_PATH) -> None:
+
+def _write_results(
+    test_instance: TestInstance, preds: np.ndarray, results_json: Path, results_nc: Path
+) -> None:
+    results = test_instance.evaluate_predictions(preds)
+
+    with results_json.open("w") as f:
+        json.dump(results, f)
+
+    ds = test_instance.to_xarray(preds)
+    ds.to_netcdf(results_nc)
+
+
+def run(
+    data_folder: Path = DATAFOLDER_PATH,
+    n_estimators: int = RF_N_ESTIMATORS,
+    max_depth: Optional[int] = RF_MAX_DEPTH,
+    min_samples_leaf: int = RF_MIN_SAMPLES_LEAF,
+) -> None:
     evaluation_datasets = CropHarvest.create_benchmark_datasets(data_folder)
     results_folder = data_folder / RANDOM_FOREST
     results_folder.mkdir(exist_ok=True)
@@ -18,37 +46,80 @@ def run(data_folder: Path = DATAFOLDER_PATH) -> None:
 
         sample_sizes = DATASET_TO_SIZES[dataset.id]
 
+        # the test data is independent of the seed and sample size, so it
+        # is loaded once per dataset instead of once per iteration
+        test_data = list(dataset.test_data(flatten_x=True, max_size=10000))
+
         for seed in SHUFFLE_SEEDS:
             dataset.shuffle(seed)
+
+            # a single estimator is shared across the sample sizes; each
+            # fit below retrains it from scratch, since every sample size
+            # must be an independent benchmark measurement. n_jobs=-1
+            # parallelizes both fit and predict_proba across all cores
+            model = RandomForestClassifier(
+                n_estimators=n_estimators,
+                max_depth=max_depth,
+                min_samples_leaf=min_samples_leaf,
+                n_jobs=-1,
+                random_state=seed,
+            )
+
             for sample_size in sample_sizes:
                 print(f"Running Random Forest for {dataset}, seed: {seed} with size {sample_size}")
 
                 json_suffix = f"{dataset.id}_{sample_size}_{seed}.json"
                 nc_suffix = f"{dataset.id}_{sample_size}_{seed}.nc"
 
+                # the combined results are the last thing to be written, so if
+                # they exist, this (seed, sample size) run has already finished
+                # and training can be skipped entirely
+                if (results_folder / f"combined_{json_suffix}").exists():
+                    print(f"Results already saved for combined_{json_suffix} - skipping")
+                    continue
+
                 train_x, train_y = dataset.as_array(flatten_x=True, num_samples=sample_size)
 
-                # train a model
-                model = RandomForestClassifier()
                 model.fit(train_x, train_y)
 
-                for test_id, test_instance in dataset.test_data(flatten_x=True, max_size=10000):
+                to_predict = []
+                for test_id, test_instance in test_data:
 
                     results_json = results_folder / f"{test_id}_{json_suffix}"
                     results_nc = results_folder / f"{test_id}_{nc_suffix}"
 
-                    if results_json.exists():
+                    if results_json.exists() & results_nc.exists():
                         print(f"Results already saved for {results_json} - skipping")
-
-                    preds = model.predict_proba(test_instance.x)[:, 1]
-
-                    results = test_instance.evaluate_predictions(preds)
-
-                    with Path(results_json).open("w") as f:
-                        json.dump(results, f)
-
-                    ds = test_instance.to_xarray(preds)
-                    ds.to_netcdf(results_nc)
+                        continue
+
+                    to_predict.append((test_instance, results_json, results_nc))
+
+                if len(to_predict) > 0:
+                    # a single predict_proba call over the concatenated
+                    # instances pays the per-call dispatch overhead once and
+                    # keeps all the trees' workers busy
+                    all_preds = model.predict_proba(
+                        np.concatenate([instance.x for instance, _, _ in to_predict])
+                    )[:, 1]
+                    split_indices = np.cumsum([len(instance) for instance, _, _ in to_predict])
+
+                    # the json and NetCDF writes are IO-bound, so the
+                    # per-instance evaluation and writing overlap in
+                    # background threads. Leaving the with block waits for
+                    # all writes, which the combined evaluation below
+                    # relies on
+                    with ThreadPoolExecutor(max_workers=2) as executor:
+                        futures = [
+                            executor.submit(
+                                _write_results, test_instance, preds, results_json, results_nc
+                            )
+                            for (test_instance, results_json, results_nc), preds in zip(
+                                to_predict, np.split(all_preds, split_indices[:-1])
+                            )
+                        ]
+                    # surface any exceptions raised by the writes
+                    for future in futures:
+                        future.result()
 
                 # finally, we want to get results when all the test instances are considered
                 # together
@@ -1,15 +1,18 @@
 from pathlib import Path
 from datetime import datetime, timedelta
 import geopandas
+import hashlib
 from dataclasses import dataclass
 import numpy as np
 import pandas as pd
 import xarray as xr
 import rasterio
-from rasterio import mask
+from rasterio import features
+from rasterio.windows import Window
 from tqdm import tqdm
 import warnings
 import h5py
+from joblib import Parallel, delayed
 
 from sklearn.metrics import roc_auc_score, f1_score
 
@@ -28,14 +31,103 @@ from .utils import DATAFOLDER_PATH, load_normalizing_dict
 
 from typing import cast, Optional, Dict, Union, Tuple, List, Sequence
 
+try:
+    from numba import njit
+
+    NUMBA_INSTALLED = True
+except ImportError:
+    NUMBA_INSTALLED = False
+
 REMOVED_BANDS = ["B1", "B10"]
 RAW_BANDS = DYNAMIC_BANDS + STATIC_BANDS
 BANDS = [x for x in DYNAMIC_BANDS if x not in REMOVED_BANDS] + STATIC_BANDS + ["NDVI"]
 
 
+def _ndvi_kernel(b8: np.ndarray, b4: np.ndarray) -> np.ndarray:
+    # both branches are evaluated eagerly, so a division by zero can occur
+    # before np.where selects the 0 branch; the caller suppresses the
+    # resulting warning
+    return np.where((b8 + b4) > 0, (b8 - b4) / (b8 + b4), 0)
+
+
+def _fillna_kernel(array: np.ndarray, mean_per_band: np.ndarray) -> np.ndarray:
+    # mean_per_band has shape [bands], and is broadcast against the
+    # trailing bands dimension of array
+    return np.where(np.isnan(array), mean_per_band, array)
+
+
+# indices into the raw band layout which survive remove_bands
+_KEEP_IDX = np.array([i for i, band in enumerate(RAW_BANDS) if band not in REMOVED_BANDS])
+_REMOVE_IDX = np.array([RAW_BANDS.index(band) for band in REMOVED_BANDS])
+
+
+# number of pixels processed per block in _process_bands; this caps the
+# size of the intermediate copies for large test rasters
+_PROCESS_BANDS_BLOCK_SIZE = 32768
+
+# number of region files processed in parallel per batch in
+# create_h5_test_instances; each holds a full raster's arrays, so this
+# caps the peak memory at a few rasters
+_TEST_FILE_BATCH_SIZE = 2
+
+
+def _select_and_stats_kernel(
+    flat: np.ndarray, keep_idx: np.ndarray, b8_col: int, b4_col: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # write the kept bands plus NDVI into a fresh array, returning it
+    # along with the per-band sums and counts over the non-NaN values
+    output = np.empty((flat.shape[0], keep_idx.shape[0] + 1), dtype=flat.dtype)
+    output[:, :-1] = flat[:, keep_idx]
+    output[:, -1] = _ndvi_kernel(flat[:, b8_col], flat[:, b4_col])
+
+    sums = np.nansum(output, axis=0, dtype=np.float64)
+    counts = (~np.isnan(output)).sum(axis=0)
+    return output, sums, counts
+
+
+if NUMBA_INSTALLED:
+
+    @njit(cache=True, nogil=True)
+    def _select_and_stats_kernel(  # noqa: F811
+        flat: np.ndarray, keep_idx: np.ndarray, b8_col: int, b4_col: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        num_rows = flat.shape[0]
+        num_bands = keep_idx.shape[0] + 1
+        output = np.empty((num_rows, num_bands), dtype=flat.dtype)
+        sums = np.zeros(num_bands)
+        counts = np.zeros(num_bands, dtype=np.int64)
+
+        # a single pass writing the kept bands plus NDVI, accumulating
+        # the per-band sums and counts over the non-NaN values
+        for i in range(num_rows):
+            for j in range(num_bands - 1):
+                val = flat[i, keep_idx[j]]
+                output[i, j] = val
+                if not np.isnan(val):
+                    sums[j] += val
+                    counts[j] += 1
+            b8, b4 = flat[i, b8_col], flat[i, b4_col]
+            ndvi = (b8 - b4) / (b8 + b4) if (b8 + b4) > 0 else 0.0
+            output[i, num_bands - 1] = ndvi
+            if not np.isnan(ndvi):
+                sums[num_bands - 1] += ndvi
+                counts[num_bands - 1] += 1
+        return output, sums, counts
+
+
+if NUMBA_INSTALLED:
+    # the kernels are numba-compatible numpy; jit them when numba is
+    # available to avoid the intermediate allocations. nogil releases the
+    # GIL inside the kernels, so the threading-backend parallelism below
+    # can actually overlap them. fastmath is deliberately not used, since
+    # it would let the compiler assume there are no NaNs - which these
+    # kernels exist to handle
+    _ndvi_kernel = njit(cache=True, nogil=True)(_ndvi_kernel)
+    _fillna_kernel = njit(cache=True, nogil=True)(_fillna_kernel)
+
+
 @dataclass
 class DataInstance:
-
     dataset: str
     label_lat: float
     label_lon: float
@@ -80,7 +172,6 @@ class TestInstance:
 
     @classmethod
     def load_from_nc(cls, filepaths: Union[Path, List[Path]]) -> Tuple:
-
         y: List[np.ndarray] = []
         preds: List[np.ndarray] = []
         lats: List[np.ndarray] = []
@@ -173,6 +264,13 @@ class Engineer:
 
         self.labels = geopandas.read_file(data_folder / LABELS_FILENAME)
         self.labels["export_end_date"] = pd.to_datetime(self.labels.export_end_date)
+        # folded into the mask cache key, so that cached label masks are
+        # invalidated when labels.geojson is regenerated
+        labels_stat = (data_folder / LABELS_FILENAME).stat()
+        self._labels_fingerprint = f"{labels_stat.st_mtime}-{labels_stat.st_size}"
+        # cached once, since process_test_file filters the labels by year
+        # for every test tif
+        self._label_export_end_years = self.labels[RequiredColumns.EXPORT_END_DATE].dt.year.values
 
         self.savedir = data_folder / "features"
         self.savedir.mkdir(exist_ok=True)
@@ -184,9 +282,20 @@ class Engineer:
 
     @staticmethod
     def find_nearest(array, value: float) -> float:
+        r"""
+        Find the value closest to `value` in a monotonic `array`
+        (e.g. raster coordinates), using a binary search instead of
+        a linear scan over the whole array
+        """
         array = np.asarray(array)
-        idx = (np.abs(array - value)).argmin()
-        return array[idx]
+        if array.shape[0] == 1:
+            return array[0]
+        if array[0] > array[-1]:
+            # e.g. the y coordinates, which are descending
+            array = array[::-1]
+        idx = int(np.clip(np.searchsorted(array, value), 1, array.shape[0] - 1))
+        left, right = array[idx - 1], array[idx]
+        return left if (value - left) <= (right - value) else right
 
     @staticmethod
     def process_filename(filename: str) -> Tuple[int, str]:
@@ -209,30 +318,45 @@ class Engineer:
 
         da = xr.open_rasterio(filepath).rename("FEATURES")
 
-        da_split_by_time: List[xr.DataArray] = []
-
         bands_per_timestep = len(DYNAMIC_BANDS)
         num_bands = len(da.band)
         num_dynamic_bands = num_bands - len(STATIC_BANDS)
 
         assert num_dynamic_bands == bands_per_timestep * NUM_TIMESTEPS
 
-        static_data = da.isel(band=slice(num_bands - len(STATIC_BANDS), num_bands))
-        average_slope = np.nanmean(static_data.values[STATIC_BANDS.index("slope"), :, :])
-
-        for timestep in range(NUM_TIMESTEPS):
-            time_specific_da = da.isel(
-                band=slice(timestep * bands_per_timestep, (timestep + 1) * bands_per_timestep)
-            )
-            time_specific_da = xr.concat([time_specific_da, static_data], "band")
-            time_specific_da["band"] = range(bands_per_timestep + len(STATIC_BANDS))
-            da_split_by_time.append(time_specific_da)
+        # float32 comfortably covers the reflectance / meteorological /
+        # topographic ranges, and halves the memory traffic of all the
+        # downstream processing
+        vals = da.values.astype(np.float32, copy=False)  # [num_bands, H, W]
+        static_np = vals[num_dynamic_bands:]
+        average_slope = np.nanmean(static_np[STATIC_BANDS.index("slope"), :, :])
+
+        # the dynamic bands are stored as timestep-contiguous blocks, so
+        # splitting them by timestep is a single reshape; the static bands
+        # are then repeated along the new time dimension. This avoids the
+        # per-timestep isel / concat DataArray copies
+        dynamic_np = vals[:num_dynamic_bands].reshape(
+            NUM_TIMESTEPS, bands_per_timestep, vals.shape[1], vals.shape[2]
+        )
+        combined = np.concatenate(
+            [dynamic_np, np.broadcast_to(static_np, (NUM_TIMESTEPS,) + static_np.shape)], axis=1
+        )
 
         timesteps = [
             start_date + timedelta(days=DAYS_PER_TIMESTEP) * i for i in range(NUM_TIMESTEPS)
         ]
 
-        dynamic_data = xr.concat(da_split_by_time, pd.Index(timesteps, name="time"))
+        dynamic_data = xr.DataArray(
+            combined,
+            dims=["time", "band", "y", "x"],
+            coords={
+                "time": pd.Index(timesteps, name="time"),
+                "band": range(bands_per_timestep + len(STATIC_BANDS)),
+                "y": da.y,
+                "x": da.x,
+            },
+            name="FEATURES",
+        )
         dynamic_data.attrs["band_descriptions"] = BANDS
 
         return dynamic_data, average_slope
@@ -249,17 +373,24 @@ class Engineer:
             self.norm_interim["mean"] = np.zeros(num_bands)
             self.norm_interim["M2"] = np.zeros(num_bands)
 
-        for time_idx in range(array.shape[0]):
-            self.norm_interim["n"] += 1
+        # compute the array's statistics once, then merge them into the
+        # running values using Chan et al.'s parallel variance algorithm.
+        # This replaces a per-timestep python loop with two numpy reductions
+        # the accumulators stay float64 for numerical stability, even when
+        # the input arrays are float32
+        n_b = array.shape[0]
+        mean_b = array.mean(axis=0, dtype=np.float64)
+        M2_b = ((array - mean_b) ** 2).sum(axis=0)
 
-            x = array[time_idx, :]
+        n_a = self.norm_interim["n"]
+        n_ab = n_a + n_b
+        delta = mean_b - self.norm_interim["mean"]
 
-            delta = x - self.norm_interim["mean"]
-            self.norm_interim["mean"] += delta / self.norm_interim["n"]
-            self.norm_interim["M2"] += delta * (x - self.norm_interim["mean"])
+        self.norm_interim["mean"] += delta * n_b / n_ab
+        self.norm_interim["M2"] += M2_b + (delta**2) * n_a * n_b / n_ab
+        self.norm_interim["n"] = n_ab
 
     def calculate_normalizing_dict(self) -> Optional[Dict[str, np.ndarray]]:
-
         if "mean" not in self.norm_interim:
             print("No normalizing dict calculated! Make sure to call update_normalizing_values")
             return None
@@ -272,7 +403,6 @@ class Engineer:
     def adjust_normalizing_dict(
         dicts: Sequence[Tuple[int, Optional[Dict[str, np.ndarray]]]]
     ) -> Optional[Dict[str, np.ndarray]]:
-
         for _, single_dict in dicts:
             if single_dict is None:
                 return None
@@ -321,10 +451,16 @@ class Engineer:
             # RuntimeWarning: invalid value encountered in true_divide
             # for cases where near_infrared + red == 0
             # since this is handled in the where condition
-            ndvi = np.where(
-                (band_1_np + band_2_np) > 0, (band_1_np - band_2_np) / (band_1_np + band_2_np), 0
-            )
-        return np.append(input_array, np.expand_dims(ndvi, -1), axis=-1)
+            ndvi = _ndvi_kernel(band_1_np, band_2_np)
+
+        # preallocate the output instead of using np.append, which would
+        # reallocate and copy every band
+        output = np.empty(
+            input_array.shape[:-1] + (input_array.shape[-1] + 1,), dtype=input_array.dtype
+        )
+        output[..., :-1] = input_array
+        output[..., -1] = ndvi
+        return output
 
     @staticmethod
     def fillna(array: np.ndarray, average_slope: float) -> Optional[np.ndarray]:
@@ -338,7 +474,9 @@ class Engineer:
             mean_per_band = np.nanmean(array, axis=0)
         elif num_dims == 3:
             bands_index = 2
-            mean_per_band = np.nanmean(np.nanmean(array, axis=0), axis=0)
+            # a single reduction over both leading axes, instead of two
+            # nanmean passes with an intermediate
+            mean_per_band = np.nanmean(array, axis=(0, 1))
         else:
             raise ValueError(f"Expected num_dims to be 2 or 3 - got {num_dims}")
 
@@ -352,12 +490,7 @@ class Engineer:
                 assert not np.isnan(mean_per_band).any()
             else:
                 return None
-        for i in range(array.shape[bands_index]):
-            if num_dims == 2:
-                array[:, i] = np.nan_to_num(array[:, i], nan=mean_per_band[i])
-            elif num_dims == 3:
-                array[:, :, i] = np.nan_to_num(array[:, :, i], nan=mean_per_band[i])
-        return array
+        return _fillna_kernel(array, mean_per_band)
 
     @staticmethod
     def remove_bands(array: np.ndarray) -> np.ndarray:
@@ -366,27 +499,87 @@ class Engineer:
         [batches, timesteps, bands]
         """
         num_dims = len(array.shape)
-        error_message = f"Expected num_dims to be 2 or 3 - got {num_dims}"
-        if num_dims == 2:
-            bands_index = 1
-        elif num_dims == 3:
-            bands_index = 2
-        else:
-            raise ValueError(error_message)
+        if num_dims not in (2, 3):
+            raise ValueError(f"Expected num_dims to be 2 or 3 - got {num_dims}")
+        # the indices to remove are precomputed at module scope, and
+        # np.delete handles both the 2D and 3D case along the bands axis
+        return np.delete(array, _REMOVE_IDX, axis=-1)
 
-        indices_to_remove: List[int] = []
-        for band in REMOVED_BANDS:
-            indices_to_remove.append(RAW_BANDS.index(band))
-        indices_to_keep = [
-            i for i in range(array.shape[bands_index]) if i not in indices_to_remove
-        ]
+    @staticmethod
+    def _process_bands(array: np.ndarray, average_slope: float) -> Optional[np.ndarray]:
+        r"""
+        Fused equivalent of calculate_ndvi, remove_bands and fillna for
+        arrays in the raw band layout. The input is streamed in pixel
+        blocks, so for large test rasters the intermediate copies stay
+        bounded at _PROCESS_BANDS_BLOCK_SIZE pixels while the NaN filling
+        still uses the band means over the whole array
+        """
+        num_dims = len(array.shape)
         if num_dims == 2:
-            return array[:, indices_to_keep]
+            blocks: Sequence[np.ndarray] = [array]
         elif num_dims == 3:
-            return array[:, :, indices_to_keep]
+            blocks = [
+                array[i : i + _PROCESS_BANDS_BLOCK_SIZE]
+                for i in range(0, array.shape[0], _PROCESS_BANDS_BLOCK_SIZE)
+            ]
         else:
-            # Unreachable code logically but mypy does not see it this way
-            raise ValueError(error_message)
+            raise ValueError(f"Expected num_dims to be 2 or 3 - got {num_dims}")
+
+        # NDVI reads the raw array with BANDS indices, mirroring
+        # calculate_ndvi
+        b8_col, b4_col = BANDS.index("B8"), BANDS.index("B4")
+
+        output = np.empty(array.shape[:-1] + (len(BANDS),), dtype=array.dtype)
+        flat_output = output.reshape(-1, len(BANDS))
+        sums = np.zeros(len(BANDS))
+        counts = np.zeros(len(BANDS), dtype=np.int64)
+
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="invalid value encountered")
+
+            row_idx = 0
+            for block in blocks:
+                flat_block = block.reshape(-1, block.shape[-1])
+                block_output, block_sums, block_counts = _select_and_stats_kernel(
+                    flat_block, _KEEP_IDX, b8_col, b4_col
+                )
+                flat_output[row_idx : row_idx + len(block_output)] = block_output
+                sums += block_sums
+                counts += block_counts
+                row_idx += len(block_output)
+
+        if counts[BANDS.index("slope")] == 0:
+            # an all-NaN slope band falls back to the tif's average slope;
+            # if that is NaN too (i.e. the whole raster has no slope data)
+            # there is nothing to fill with
+            if np.isnan(average_slope):
+                return None
+            sums[BANDS.index("slope")] = average_slope
+            counts[BANDS.index("slope")] = 1
+        if (counts == 0).any():
+            return None
+        mean_per_band = sums / counts
+
+        if (counts != flat_output.shape[0]).any():
+            for block_start in range(0, flat_output.shape[0], _PROCESS_BANDS_BLOCK_SIZE):
+                block_slice = slice(block_start, block_start + _PROCESS_BANDS_BLOCK_SIZE)
+                flat_output[block_slice] = _fillna_kernel(flat_output[block_slice], mean_per_band)
+        return output
+
+    def _mask_cache_path(self, path_to_file: Path, identifier_plus_idx: str) -> Path:
+        r"""
+        The cache key combines the start of the tif file with its
+        modification time and the labels file's fingerprint, so edited
+        or re-exported tifs - and regenerated labels - miss the cache
+        """
+        cache_dir = self.test_savedir / "cache"
+        cache_dir.mkdir(exist_ok=True)
+        with path_to_file.open("rb") as f:
+            header = f.read(4096)
+        key = hashlib.blake2b(
+            header + str(path_to_file.stat().st_mtime).encode() + self._labels_fingerprint.encode()
+        ).hexdigest()[:16]
+        return cache_dir / f"{identifier_plus_idx}_{key}.npz"
 
     def process_test_file(self, path_to_file: Path, id_in_region: int) -> Tuple[str, TestInstance]:
         id_components = path_to_file.name.split("_")
@@ -397,76 +590,121 @@ class Engineer:
             days=NUM_TIMESTEPS * DAYS_PER_TIMESTEP
         )
         da, average_slope = self.load_tif(path_to_file, start_date=start_date)
-        lon, lat = np.meshgrid(da.x.values, da.y.values)
-        flat_lat, flat_lon = (
-            np.squeeze(lat.reshape(-1, 1), -1),
-            np.squeeze(lon.reshape(-1, 1), -1),
-        )
 
         x_np = da.values
         x_np = x_np.reshape(x_np.shape[0], x_np.shape[1], x_np.shape[2] * x_np.shape[3])
         x_np = np.moveaxis(x_np, -1, 0)
-        x_np = self.calculate_ndvi(x_np)
-        x_np = self.remove_bands(x_np)
-        final_x = self.fillna(x_np, average_slope)
+        final_x = self._process_bands(x_np, average_slope)
         if final_x is None:
             raise RuntimeError(
                 "fillna on the test instance returned None; "
                 "does the test instance contain NaN only bands?"
             )
 
-        # finally, we need to calculate the mask
-        region_bbox = TEST_REGIONS[identifier]
-        relevant_indices = self.labels.apply(
-            lambda x: (
-                region_bbox.contains(x[RequiredColumns.LAT], x[RequiredColumns.LON])
-                and (x[RequiredColumns.EXPORT_END_DATE].year == int(end_year))
-            ),
-            axis=1,
-        )
-        relevant_rows = self.labels[relevant_indices]
-        positive_geoms = relevant_rows[relevant_rows[NullableColumns.LABEL] == crop][
-            RequiredColumns.GEOMETRY
-        ].tolist()
-        negative_geoms = relevant_rows[relevant_rows[NullableColumns.LABEL] != crop][
-            RequiredColumns.GEOMETRY
-        ].tolist()
+        # the label mask and coordinate grids only depend on the tif file,
+        # so they are cached on disk keyed by its content, mirroring the
+        # checkpointing of the h5 arrays
+        cache_path = self._mask_cache_path(path_to_file, identifier_plus_idx)
+        if cache_path.exists():
+            cached = np.load(cache_path)
+            flat_lat, flat_lon, y = cached["lats"], cached["lons"], cached["y"]
+        else:
+            lon, lat = np.meshgrid(da.x.values, da.y.values)
+            flat_lat, flat_lon = (
+                np.squeeze(lat.reshape(-1, 1), -1),
+                np.squeeze(lon.reshape(-1, 1), -1),
+            )
 
-        with rasterio.open(path_to_file) as src:
-            # the mask is True outside shapes, and False inside shapes. We want the opposite
-            positive, _, _ = mask.raster_geometry_mask(src, positive_geoms, crop=False)
-            negative, _, _ = mask.raster_geometry_mask(src, negative_geoms, crop=False)
-        # reverse the booleans so that 1 = in the
-        positive = (~positive.reshape(positive.shape[0] * positive.shape[1])).astype(int)
-        negative = (~negative.reshape(negative.shape[0] * negative.shape[1])).astype(int) * -1
-        y = positive + negative
-
-        # swap missing and negative values, since this will be easier to use in the future
-        negative = y == -1
-        missing = y == 0
-        y[negative] = 0
-        y[missing] = MISSING_DATA
+            region_bbox = TEST_REGIONS[identifier]
+            # BBox.contains is elementwise, so passing the label coordinate
+            # arrays filters all rows in one vectorized call instead of a
+            # python lambda per row
+            relevant_indices = region_bbox.contains(
+                self.labels[RequiredColumns.LAT].values, self.labels[RequiredColumns.LON].values
+            ) & (self._label_export_end_years == int(end_year))
+            relevant_rows = self.labels[relevant_indices]
+            positive_geoms = relevant_rows[relevant_rows[NullableColumns.LABEL] == crop][
+                RequiredColumns.GEOMETRY
+            ].tolist()
+            negative_geoms = relevant_rows[relevant_rows[NullableColumns.LABEL] != crop][
+                RequiredColumns.GEOMETRY
+            ].tolist()
+
+            with rasterio.open(path_to_file) as src:
+                # rasterize each class into an integer mask directly,
+                # instead of the costlier geometry-mask calls with their
+                # boolean inversions. Subtracting the masks keeps the
+                # original overlap behaviour: a pixel which is both
+                # positive and negative becomes 0 (missing)
+                positive = features.rasterize(
+                    [(geom, 1) for geom in positive_geoms],
+                    out_shape=(src.height, src.width),
+                    transform=src.transform,
+                    fill=0,
+                    dtype="int16",
+                )
+                negative = features.rasterize(
+                    [(geom, 1) for geom in negative_geoms],
+                    out_shape=(src.height, src.width),
+                    transform=src.transform,
+                    fill=0,
+                    dtype="int16",
+                )
+            y = (positive - negative).reshape(positive.shape[0] * positive.shape[1]).astype(int)
+
+            # swap missing and negative values, since this will be easier
+            # to use in the future
+            negative = y == -1
+            missing = y == 0
+            y[negative] = 0
+            y[missing] = MISSING_DATA
+
+            np.savez_compressed(cache_path, lats=flat_lat, lons=flat_lon, y=y)
         assert len(y) == final_x.shape[0]
 
         return identifier_plus_idx, TestInstance(x=final_x, y=y, lats=flat_lat, lons=flat_lon)
 
     def process_single_file(self, path_to_file: Path, row: pd.Series) -> Optional[DataInstance]:
-        start_date = row.export_end_date - timedelta(days=NUM_TIMESTEPS * DAYS_PER_TIMESTEP)
-        da, average_slope = self.load_tif(path_to_file, start_date=start_date)
-        closest_lon = self.find_nearest(da.x, row[RequiredColumns.LON])
-        closest_lat = self.find_nearest(da.y, row[RequiredColumns.LAT])
+        with rasterio.open(path_to_file) as src:
+            bands_per_timestep = len(DYNAMIC_BANDS)
+            num_dynamic_bands = src.count - len(STATIC_BANDS)
+            assert num_dynamic_bands == bands_per_timestep * NUM_TIMESTEPS
+
+            # only the pixel closest to the label is kept, so read just that
+            # pixel's window instead of loading the entire raster
+            row_idx, col_idx = src.index(row[RequiredColumns.LON], row[RequiredColumns.LAT])
+            row_idx = min(max(row_idx, 0), src.height - 1)
+            col_idx = min(max(col_idx, 0), src.width - 1)
+            closest_lon, closest_lat = src.xy(row_idx, col_idx)
+
+            pixel = src.read(window=Window(col_idx, row_idx, 1, 1), out_dtype=np.float32).reshape(
+                src.count
+            )
 
-        labelled_np = da.sel(x=closest_lon).sel(y=closest_lat).values
+            # the average slope is only used by the NaN filling if the
+            # pixel's own slope is missing, so read just the slope band
+            average_slope = np.nanmean(
+                src.read(num_dynamic_bands + STATIC_BANDS.index("slope") + 1)
+            )
 
-        labelled_np = self.calculate_ndvi(labelled_np)
-        labelled_np = self.remove_bands(labelled_np)
+        # the dynamic bands are stored as timestep-contiguous blocks
+        # (see load_tif); the static bands are repeated along time
+        labelled_np = np.concatenate(
+            [
+                pixel[:num_dynamic_bands].reshape(NUM_TIMESTEPS, bands_per_timestep),
+                np.broadcast_to(pixel[num_dynamic_bands:], (NUM_TIMESTEPS, len(STATIC_BANDS))),
+            ],
+            axis=1,
+        )
 
-        labelled_array = self.fillna(labelled_np, average_slope)
+        labelled_array = self._process_bands(labelled_np, average_slope)
         if labelled_array is None:
             return None
 
-        if not row[RequiredColumns.IS_TEST]:
-            self.update_normalizing_values(labelled_array)
+        # a no-op for the float32 arrays the pipeline produces, but
+        # guarantees the stored arrays are compact and contiguous, which
+        # keeps the downstream stacking and model fitting copy-free
+        labelled_array = np.ascontiguousarray(labelled_array, dtype=np.float32)
 
         return DataInstance(
             label_lat=row[RequiredColumns.LAT],
@@ -487,14 +725,24 @@ class Engineer:
             if len(all_region_files) == 0:
                 print(f"No downloaded files for {region_identifier}")
                 continue
-            for region_idx, filepath in enumerate(all_region_files):
-                instance_name, test_instance = self.process_test_file(filepath, region_idx)
-                if test_instance is not None:
-                    hf = h5py.File(self.test_savedir / f"{instance_name}.h5", "w")
+            # the region files are independent, so they can be processed in
+            # parallel; they are dispatched in small batches, with each
+            # batch's h5 files written before the next is submitted, so
+            # only a batch's worth of rasters is held in memory at once.
+            # The h5 writes stay on the main thread
+            for batch_start in range(0, len(all_region_files), _TEST_FILE_BATCH_SIZE):
+                batch = all_region_files[batch_start : batch_start + _TEST_FILE_BATCH_SIZE]
+                processed_files = Parallel(n_jobs=len(batch), backend="threading")(
+                    delayed(self.process_test_file)(filepath, batch_start + batch_idx)
+                    for batch_idx, filepath in enumerate(batch)
+                )
+                for instance_name, test_instance in processed_files:
+                    if test_instance is not None:
+                        hf = h5py.File(self.test_savedir / f"{instance_name}.h5", "w")
 
-                    for key, val in test_instance.datasets.items():
-                        hf.create_dataset(key, data=val)
-                    hf.close()
+                        for key, val in test_instance.datasets.items():
+                            hf.create_dataset(key, data=val)
+                        hf.close()
 
         for _, dataset in TEST_DATASETS.items():
             x: List[np.ndarray] = []
@@ -503,7 +751,8 @@ class Engineer:
             lons: List[float] = []
             relevant_labels = self.labels[self.labels[RequiredColumns.DATASET] == dataset]
 
-            for _, row in tqdm(relevant_labels.iterrows()):
+            rows_and_paths: List[Tuple[pd.Series, Path]] = []
+            for _, row in relevant_labels.iterrows():
                 tif_paths = list(
                     self.eo_files.glob(
                         f"{row[RequiredColumns.INDEX]}-{row[RequiredColumns.DATASET]}_*.tif"
@@ -511,10 +760,16 @@ class Engineer:
                 )
                 if len(tif_paths) == 0:
                     continue
-                else:
-                    tif_path = tif_paths[0]
-                instance = self.process_single_file(tif_path, row)
+                rows_and_paths.append((row, tif_paths[0]))
+
+            instances = Parallel(n_jobs=-1, backend="threading")(
+                delayed(self.process_single_file)(tif_path, row)
+                for row, tif_path in tqdm(rows_and_paths)
+            )
+            for (row, _), instance in zip(rows_and_paths, instances):
                 if instance is not None:
+                    if not row[RequiredColumns.IS_TEST]:
+                        self.update_normalizing_values(instance.array)
                     x.append(instance.array)
                     y.append(instance.is_crop)
                     lats.append(instance.label_lat)
@@ -539,9 +794,8 @@ class Engineer:
                 num_existing_files = len(list(arrays_dir.glob("*")))
                 old_normalizing_dict = (num_existing_files, old_nd)
 
-        skipped_files: int = 0
-        num_new_files: int = 0
-        for file_path in tqdm(list(self.eo_files.glob("*.tif"))):
+        files_to_process: List[Tuple[Path, str, pd.Series]] = []
+        for file_path in self.eo_files.glob("*.tif"):
             file_index, dataset = self.process_filename(file_path.name)
             file_name = f"{file_index}_{dataset}.h5"
             if (checkpoint) & ((arrays_dir / file_name).exists()):
@@ -554,9 +808,22 @@ class Engineer:
                     & (self.labels[RequiredColumns.INDEX] == file_index)
                 )
             ].iloc[0]
+            files_to_process.append((file_path, file_name, file_row))
+
+        # the files are independent, so they can be processed in parallel.
+        # The h5 writes and the normalizing-value updates (which mutate
+        # shared state) stay on the main thread, in file order
+        instances = Parallel(n_jobs=-1, backend="threading")(
+            delayed(self.process_single_file)(file_path, row)
+            for file_path, _, row in tqdm(files_to_process)
+        )
 
-            instance = self.process_single_file(file_path, row=file_row)
+        skipped_files: int = 0
+        num_new_files: int = 0
+        for (_, file_name, file_row), instance in zip(files_to_process, instances):
             if instance is not None:
+                if not file_row[RequiredColumns.IS_TEST]:
+                    self.update_normalizing_values(instance.array)
 
                 hf = h5py.File(arrays_dir / file_name, "w")
                 hf.create_dataset("array", data=instance.array)
@@ -2,7 +2,7 @@ from pathlib import Path
 from datetime import datetime
 import numpy as np
 
-from cropharvest.engineer import Engineer, BANDS, DYNAMIC_BANDS, STATIC_BANDS
+from cropharvest.engineer import Engineer, BANDS, RAW_BANDS, DYNAMIC_BANDS, STATIC_BANDS
 from cropharvest.config import NUM_TIMESTEPS
 
 from typing import Dict, Union
@@ -56,6 +56,40 @@ def test_fillna_simulated():
     assert np.array_equal(new_array, expected_array)
 
 
+def test_process_bands_matches_unfused():
+
+    np.random.seed(42)
+    array = np.random.rand(NUM_TIMESTEPS, len(RAW_BANDS))
+    array[0, 3] = float("NaN")
+    # slope is all NaN, so it should be filled with the average slope
+    array[:, RAW_BANDS.index("slope")] = float("NaN")
+    average_slope = 0.5
+
+    expected = Engineer.fillna(
+        Engineer.remove_bands(Engineer.calculate_ndvi(array.copy())), average_slope
+    )
+    fused = Engineer._process_bands(array, average_slope)
+    assert fused.shape == (NUM_TIMESTEPS, len(BANDS))
+    assert np.allclose(fused, expected)
+
+    # if the average slope is NaN too, there is nothing to fill
+    # the slope band with
+    assert Engineer._process_bands(array, average_slope=float("NaN")) is None
+
+
+def test_process_bands_3d():
+
+    np.random.seed(42)
+    array = np.random.rand(4, NUM_TIMESTEPS, len(RAW_BANDS))
+
+    expected = Engineer.fillna(
+        Engineer.remove_bands(Engineer.calculate_ndvi(array.copy())), average_slope=1
+    )
+    fused = Engineer._process_bands(array, average_slope=1)
+    assert fused.shape == (4, NUM_TIMESTEPS, len(BANDS))
+    assert np.allclose(fused, expected)
+
+
 def test_normalizing_dict():
     class TestEngineer(Engineer):
         def __init__(self):
@@ -84,6 +118,13 @@ def test_find_nearest():
 
     assert Engineer.find_nearest(array, target) == 1
 
+    # descending arrays (e.g. the y coordinates of a raster)
+    # should also be handled
+    descending = np.array([5, 4, 3, 2, 1])
+
+    assert Engineer.find_nearest(descending, 4.6) == 5
+    assert Engineer.find_nearest(descending, 0) == 1
+
 
 def test_filename_correctly_processed():
 